@@ -0,0 +1,311 @@
+import cv2
+import numpy as np
+import os
+import threading
+import time
+from datetime import datetime
+
+# --- 재연결 설정값 ---
+STALL_TIMEOUT = 2.0        # 이 시간(초) 동안 새 프레임이 없으면 카메라가 멈춘 것으로 판단
+MAX_READ_FAILURES = 5      # 연속으로 읽기에 실패하면 재연결을 시도하는 횟수
+RECONNECT_BACKOFF_MIN = 0.5  # 첫 재연결 대기 시간(초)
+RECONNECT_BACKOFF_MAX = 8.0  # 재연결 대기 시간의 최댓값(초)
+FRAME_WAIT_PERIODS = 2     # 여러 카메라를 읽을 때 새 프레임을 기다리는 최대 시간 (가장 느린 카메라의 실제 프레임 간격 배수)
+FRAME_INTERVAL_SMOOTHING = 0.1 # 실제 프레임 간격을 구할 때 새 측정값의 반영 비율 (지수 이동 평균)
+# --- ---
+
+def gstreamer_pipeline(sensor_id, capture_width, capture_height, framerate=30):
+    """Jetson Nano의 CSI 카메라를 위한 GStreamer 파이프라인"""
+    return (
+        f"nvarguscamerasrc sensor-id={sensor_id} ! "
+        f"video/x-raw(memory:NVMM), width=(int){capture_width}, height=(int){capture_height}, framerate=(fraction){framerate}/1 ! "
+        "nvvidconv flip-method=0 ! "
+        "video/x-raw, format=(string)BGRx ! "
+        "videoconvert ! "
+        "video/x-raw, format=(string)BGR ! appsink"
+    )
+
+class CameraSource:
+    """
+    백그라운드 스레드에서 프레임을 읽고, 읽기 실패나 멈춤이 감지되면
+    점점 늘어나는 대기 시간(backoff)으로 카메라를 다시 여는 감시형 카메라 소스.
+    read()는 빈(검은) 프레임을 만들어내지 않고, 끊긴 동안에는 (False, None)을 돌려줍니다.
+
+    장치(VideoCapture)는 그 장치를 연 읽기 스레드만 읽고 닫습니다. 장치가 cap.read()에서 멈추면
+    밖에서 닫지 않고 그 스레드를 버린 뒤(세대 번호 증가) 새 읽기 스레드로 다시 연결합니다.
+    버려진 스레드는 cap.read()에서 빠져나오는 대로 자기 장치를 닫고 끝나며, 새 스레드는 그때까지
+    장치를 새로 열지 않으므로 버려진 스레드와 열린 장치가 쌓이지 않습니다.
+
+    connected와 재연결 횟수는 장치를 연 시점이 아니라 첫 프레임이 들어온 시점에 바뀝니다.
+    재연결 대기 시간은 인스턴스에 남아, 열리기는 하지만 프레임이 나오지 않는 장치는 점점 드물게 다시 엽니다.
+    """
+
+    def __init__(self, index, width, height, is_csi=False, stall_timeout=STALL_TIMEOUT):
+        self.index = index
+        self.width = width
+        self.height = height
+        self.is_csi = is_csi
+        self.stall_timeout = stall_timeout
+
+        self.fps = 30.0
+        self.frame_interval = 1.0 / self.fps # 실제로 프레임이 들어오는 간격(초). 카메라가 알려주는 FPS와 다를 수 있습니다.
+        self.connected = False
+        self.reconnect_count = 0
+
+        self._crop = (0, 0)
+        self._frame = None
+        self._frame_seq = 0
+        self._read_seq = 0
+        self._last_frame_time = 0.0
+        self._generation = 0
+        self._backoff = RECONNECT_BACKOFF_MIN
+        self._abandoned_thread = None
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _open(self):
+        """카메라를 열고 중앙 크롭 좌표를 계산합니다. (장치, 오류 메시지)를 돌려주며 실패하면 장치는 None입니다."""
+        if self.is_csi:
+            pipeline = gstreamer_pipeline(self.index, self.width, self.height)
+            cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+        else:
+            cap = cv2.VideoCapture(self.index)
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+
+        if not cap.isOpened():
+            cap.release()
+            return None, f"카메라 #{self.index}를 열 수 없습니다. 연결을 확인하세요."
+
+        actual_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        actual_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if actual_width < self.width or actual_height < self.height:
+            cap.release()
+            return None, f"카메라 #{self.index}의 실제 해상도({actual_width}x{actual_height})가 원하는 크기보다 작습니다."
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if fps > 0:
+            self.fps = fps
+            self.frame_interval = 1.0 / fps
+
+        with self._cond:
+            self._crop = ((actual_width - self.width) // 2, (actual_height - self.height) // 2)
+        return cap, None
+
+    def start(self):
+        """카메라를 처음 열고 읽기 스레드를 시작합니다. 첫 연결에 실패하면 False를 돌려줍니다."""
+        cap, error = self._open()
+        if error:
+            print(f"오류: {error}")
+            return False
+
+        self._start_reader(cap)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.connected, self.stall_timeout):
+                print(f"경고: 카메라 #{self.index}에서 아직 프레임이 들어오지 않습니다. 계속 재시도합니다.")
+        return True
+
+    def _start_reader(self, cap):
+        """새 세대의 읽기 스레드를 시작합니다. cap이 None이면 그 스레드가 재연결부터 시작합니다."""
+        with self._cond:
+            self._generation += 1
+            generation = self._generation
+            self.connected = False
+            self._cond.notify_all()
+
+        # 이전 스레드는 아직 멈춘 장치를 쥐고 있을 수 있으므로, 새 스레드가 장치를 열기 전에 끝났는지 확인합니다.
+        self._abandoned_thread = self._thread
+        self._thread = threading.Thread(target=self._run, args=(cap, generation), name=f"camera-{self.index}", daemon=True)
+        self._thread.start()
+
+    def _is_current(self, generation):
+        return generation == self._generation and not self._stop_event.is_set()
+
+    def _run(self, cap, generation):
+        failures = 0
+        reconnecting = cap is None
+        try:
+            while self._is_current(generation):
+                if cap is None:
+                    cap = self._reconnect(generation)
+                    failures = 0
+                    reconnecting = True
+                    continue
+
+                ret, frame = cap.read()
+                if not ret:
+                    failures += 1
+                    if failures >= MAX_READ_FAILURES:
+                        with self._cond:
+                            if generation != self._generation:
+                                break
+                            self.connected = False
+                            self._cond.notify_all()
+                        print(f"경고: 카메라 #{self.index}에서 프레임을 읽을 수 없습니다. 재연결을 시도합니다.")
+                        cap.release()
+                        cap = None
+                    continue
+
+                failures = 0
+                crop_x, crop_y = self._crop
+                cropped_frame = frame[crop_y : crop_y + self.height, crop_x : crop_x + self.width]
+                with self._cond:
+                    # 멈춤으로 버려진 뒤에 늦게 도착한 프레임은 쓰지 않습니다.
+                    if generation != self._generation:
+                        break
+                    first_frame = not self.connected
+                    now = time.monotonic()
+                    # 자동 노출 등으로 카메라가 알려주는 FPS보다 느려질 수 있으므로 실제 간격을 잽니다.
+                    interval = now - self._last_frame_time
+                    if not first_frame and interval < self.stall_timeout:
+                        self.frame_interval += (interval - self.frame_interval) * FRAME_INTERVAL_SMOOTHING
+                    self.connected = True
+                    self._frame = cropped_frame
+                    self._frame_seq += 1
+                    self._last_frame_time = now
+                    self._cond.notify_all()
+
+                # 장치가 열린 것만으로는 회복으로 보지 않고, 첫 프레임이 들어와야 재연결 성공으로 칩니다.
+                if first_frame:
+                    self._backoff = RECONNECT_BACKOFF_MIN
+                    if reconnecting:
+                        self.reconnect_count += 1
+                        print(f">>> 카메라 #{self.index} 재연결에 성공했습니다.")
+                        reconnecting = False
+        finally:
+            if cap is not None:
+                cap.release()
+
+    def _reconnect(self, generation):
+        """
+        카메라가 다시 열릴 때까지 대기 시간을 두 배씩 늘려가며 재시도합니다. 연 장치(또는 None)를 돌려줍니다.
+        대기 시간은 첫 프레임이 들어올 때까지 줄어들지 않습니다.
+        """
+        while not self._stop_event.wait(self._backoff) and self._is_current(generation):
+            self._backoff = min(self._backoff * 2, RECONNECT_BACKOFF_MAX)
+            abandoned = self._abandoned_thread
+            if abandoned is not None and abandoned.is_alive():
+                continue
+            # 세대가 바뀌었거나 종료 중이면 돌려받은 _run()이 finally에서 닫습니다.
+            cap, error = self._open()
+            if error is None:
+                return cap
+        return None
+
+    def is_stalled(self):
+        return time.monotonic() - self._last_frame_time > self.stall_timeout
+
+    def read(self, timeout=None):
+        """
+        아직 읽지 않은 새 프레임을 기다렸다가 돌려줍니다.
+        카메라가 끊겨 있으면 기다리지 않고, timeout 안에 새 프레임이 없어도 (False, None)을 돌려줍니다.
+        """
+        if timeout is None:
+            timeout = self.stall_timeout
+
+        with self._cond:
+            if not self.connected:
+                return False, None
+            self._cond.wait_for(
+                lambda: self._frame_seq != self._read_seq or not self.connected or self._stop_event.is_set(), timeout
+            )
+            if self._frame_seq != self._read_seq and self.connected:
+                self._read_seq = self._frame_seq
+                return True, self._frame
+            stalled = self.connected and self.is_stalled()
+
+        if stalled:
+            print(f"경고: 카메라 #{self.index}가 {self.stall_timeout}초 동안 응답하지 않습니다. 재연결을 시도합니다.")
+            self._start_reader(None)
+        return False, None
+
+    def stop(self):
+        self._stop_event.set()
+        with self._cond:
+            self.connected = False
+            self._cond.notify_all()
+        # 장치는 읽기 스레드가 cap.read()를 마친 뒤 스스로 닫습니다.
+        if self._thread is not None:
+            self._thread.join(timeout=self.stall_timeout)
+
+def open_cameras(indices, width, height, is_csi=False):
+    """여러 카메라를 감시형 소스로 엽니다. 하나라도 실패하면 모두 닫고 빈 리스트를 돌려줍니다."""
+    sources = []
+    for index in indices:
+        source = CameraSource(index, width, height, is_csi)
+        if is_csi:
+            print(f"CSI 카메라 #{index} (GStreamer) 모드로 {width}x{height} 해상도를 요청합니다.")
+        else:
+            print(f"USB 카메라 #{index} 모드로 {width}x{height} 해상도를 요청합니다.")
+
+        if not source.start():
+            for s in sources:
+                s.stop()
+            return []
+        sources.append(source)
+    return sources
+
+def read_frames(sources, timeout=None):
+    """
+    모든 카메라에서 새 프레임을 한 장씩 읽습니다. 끊겼거나 이번에 새 프레임이 없는 카메라 자리는 None이며,
+    끊김 여부는 None이 아니라 각 소스의 connected로 판단해야 합니다.
+    기다리는 시간은 모든 카메라가 하나의 마감 시각을 나눠 쓰므로, 멈춘 카메라가 있어도 다른 카메라는
+    최대 timeout(기본값: 연결된 카메라 중 가장 느린 카메라의 실제 프레임 간격 x FRAME_WAIT_PERIODS)만큼만 늦어집니다.
+    """
+    if timeout is None:
+        intervals = [source.frame_interval for source in sources if source.connected]
+        timeout = FRAME_WAIT_PERIODS * max(intervals or [1.0 / source.fps for source in sources])
+    deadline = time.monotonic() + timeout
+    frames = []
+    for source in sources:
+        ret, frame = source.read(timeout=max(0.0, deadline - time.monotonic()))
+        frames.append(frame if ret else None)
+
+    # 모든 카메라가 끊겨 있으면 read()가 곧바로 돌아오므로, 호출한 루프가 헛돌지 않도록 남은 시간만큼 쉽니다.
+    if all(frame is None for frame in frames):
+        time.sleep(max(0.0, deadline - time.monotonic()))
+    return frames
+
+def no_signal_frame(width, height):
+    """끊긴 카메라 자리에 화면에만 보여줄 NO SIGNAL 프레임을 만듭니다. (저장하지 않습니다)"""
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    cv2.putText(frame, 'NO SIGNAL - reconnecting', (10, height // 2), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+    return frame
+
+class GapLog:
+    """
+    카메라가 끊겼던 구간을 세션 폴더의 gaps.csv에 기록합니다.
+    끊긴 동안에는 빈 프레임을 저장하지 않으므로, 이 파일로 빠진 구간을 확인할 수 있습니다.
+    """
+
+    def __init__(self, session_dir):
+        self.path = os.path.join(session_dir, "gaps.csv")
+        self._open_gaps = {}
+        self.gap_count = 0
+
+    def update(self, camera_index, ok, frame_number):
+        """매 프레임마다 호출합니다. 끊김이 시작되거나 끝나는 시점에만 파일에 기록합니다."""
+        if not ok and camera_index not in self._open_gaps:
+            self._open_gaps[camera_index] = (datetime.now(), frame_number)
+        elif ok and camera_index in self._open_gaps:
+            self._write(camera_index, frame_number)
+
+    def _write(self, camera_index, end_frame_number):
+        start_time, start_frame_number = self._open_gaps.pop(camera_index)
+        end_time = datetime.now()
+        is_new = not os.path.exists(self.path)
+        with open(self.path, "a") as f:
+            if is_new:
+                f.write("camera,start_time,end_time,duration_sec,start_frame,end_frame\n")
+            f.write(
+                f"{camera_index},{start_time.isoformat(timespec='milliseconds')},"
+                f"{end_time.isoformat(timespec='milliseconds')},"
+                f"{(end_time - start_time).total_seconds():.3f},{start_frame_number},{end_frame_number}\n"
+            )
+        self.gap_count += 1
+
+    def close(self, frame_number):
+        """세션이 끝날 때 아직 열려 있는 끊김 구간을 모두 기록합니다."""
+        for camera_index in list(self._open_gaps):
+            self._write(camera_index, frame_number)
@@ -0,0 +1,281 @@
+import cv2
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from camera_source import open_cameras, read_frames, GapLog
+
+# --- 저장 큐 설정값 ---
+WRITE_QUEUE_SIZE = 64 # 카메라별 저장 대기열 크기. 가득 차면 캡처를 멈추지 않고 프레임을 버립니다.
+# --- ---
+
+class CameraWriter:
+    """
+    카메라 한 대의 이미지/비디오 저장을 전담하는 스레드.
+    디스크 쓰기가 느려도 캡처 루프가 기다리지 않도록, 대기열이 가득 차면 프레임을 버리고 개수를 셉니다.
+    """
+
+    def __init__(self, camera_index, video_writer=None, image_dir=None):
+        self.camera_index = camera_index
+        self.video_writer = video_writer
+        self.image_dir = image_dir
+        self.saved_images = 0
+        self.dropped_frames = 0
+        self._next_image_number = 1
+        self._queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name=f"writer-{camera_index}", daemon=True)
+        self._thread.start()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def put(self, frame, save_image, write_video):
+        """
+        저장 대기열에 프레임을 넣습니다. 이미지로 저장될 경우 그 파일 경로를 돌려주고,
+        그 외(비디오만 저장, 대기열이 가득 차 버린 경우)에는 None을 돌려줍니다.
+        """
+        filename = None
+        if save_image and self.image_dir is not None:
+            filename = os.path.join(self.image_dir, f"frame_{self._next_image_number:06d}.jpg")
+        try:
+            self._queue.put_nowait((frame, filename, write_video))
+        except queue.Full:
+            self.dropped_frames += 1
+            return None
+        if filename is not None:
+            self._next_image_number += 1
+        return filename
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, filename, write_video = item
+            if write_video and self.video_writer is not None:
+                self.video_writer.write(frame)
+            if filename is not None:
+                cv2.imwrite(filename, frame)
+                self.saved_images += 1
+
+    def close(self):
+        """남은 프레임을 모두 저장한 뒤 스레드를 종료하고 비디오 파일을 닫습니다."""
+        self._queue.put(None)
+        self._thread.join()
+        if self.video_writer is not None:
+            self.video_writer.release()
+
+class CaptureSession:
+    """녹화 한 번(세션)에 해당하는 저장 폴더, 카메라별 저장 스레드, 끊김 기록을 묶어 관리합니다."""
+
+    def __init__(self, path, writers, gap_log):
+        self.path = path
+        self.writers = writers
+        self.gap_log = gap_log
+        self.frame_count = 0
+        self.started_at = datetime.now()
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+        self.gap_log.close(self.frame_count)
+
+class CaptureEngine:
+    """
+    여러 대의 감시형 카메라를 열어 두고, 프레임을 읽어 세션별로 저장하는 캡처 엔진.
+    start_session()/stop_session()/stats()는 다른 스레드(제어 서버 등)에서 호출해도 안전하며,
+    무거운 작업(폴더 생성, 파일 닫기)은 호출한 스레드에서 처리하므로 캡처 루프를 막지 않습니다.
+    """
+
+    def __init__(self, camera_indices, width, height, is_csi=False, output_dir="data_recordings",
+                 save_images=True, save_video=True, image_save_fps=10, video_save_fps=10, prelabel_sink=None):
+        self.camera_indices = list(camera_indices)
+        self.width = width
+        self.height = height
+        self.is_csi = is_csi
+        self.output_dir = output_dir
+        self.save_images = save_images
+        self.save_video = save_video
+        self.image_save_fps = image_save_fps
+        self.video_save_fps = video_save_fps
+        self.prelabel_sink = prelabel_sink
+
+        self.sources = []
+        self.image_capture_interval = 0
+        self.quit_requested = False
+
+        self._session = None
+        self._lock = threading.Lock()
+        self._session_lock = threading.Lock() # start/stop 호출끼리의 순서 보장용
+        self._latest_frames = [None] * len(self.camera_indices)
+        self._fps = [0.0] * len(self.camera_indices)
+        self._fps_counts = [0] * len(self.camera_indices)
+        self._fps_since = time.monotonic()
+        self._missed_frames = [0] * len(self.camera_indices)
+        self._last_writers = [None] * len(self.camera_indices)
+
+    def open(self):
+        """모든 카메라를 엽니다. 하나라도 실패하면 False를 돌려줍니다."""
+        self.sources = open_cameras(self.camera_indices, self.width, self.height, self.is_csi)
+        if not self.sources:
+            return False
+
+        # 실제 카메라 FPS 기반으로 이미지 저장 간격 계산
+        camera_fps = self.sources[0].fps
+        if self.save_images and self.image_save_fps > 0:
+            self.image_capture_interval = max(1, int(camera_fps / self.image_save_fps))
+        return True
+
+    def close(self):
+        self.stop_session()
+        if self.prelabel_sink is not None:
+            self.prelabel_sink.stop()
+        for source in self.sources:
+            source.stop()
+        self.sources = []
+
+    @property
+    def is_recording(self):
+        return self._session is not None
+
+    @property
+    def session_path(self):
+        session = self._session
+        return session.path if session else None
+
+    def _new_session_path(self):
+        current_time_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_save_path = os.path.join(self.output_dir, current_time_str)
+        # 같은 초에 세션이 여러 번 시작되면 폴더 이름 뒤에 번호를 붙입니다.
+        suffix = 1
+        while os.path.exists(base_save_path):
+            base_save_path = os.path.join(self.output_dir, f"{current_time_str}_{suffix}")
+            suffix += 1
+        return base_save_path
+
+    def start_session(self):
+        """새 세션 폴더를 만들고 녹화를 시작합니다. 이미 녹화 중이면 현재 세션 경로를 돌려줍니다."""
+        with self._session_lock:
+            if self._session is not None:
+                return self._session.path
+
+            base_save_path = self._new_session_path()
+            os.makedirs(base_save_path, exist_ok=True)
+
+            writers = []
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            for index in self.camera_indices:
+                video_writer = None
+                image_dir = None
+                if self.save_video:
+                    filename = os.path.join(base_save_path, f"cam_{index}.mp4")
+                    video_writer = cv2.VideoWriter(filename, fourcc, self.video_save_fps, (self.width, self.height))
+                if self.save_images:
+                    image_dir = os.path.join(base_save_path, "images", f"cam_{index}")
+                    os.makedirs(image_dir, exist_ok=True)
+                writers.append(CameraWriter(index, video_writer, image_dir))
+
+            session = CaptureSession(base_save_path, writers, GapLog(base_save_path))
+            with self._lock:
+                self._session = session
+            return base_save_path
+
+    def stop_session(self):
+        """녹화를 멈추고 남은 프레임을 모두 저장합니다. 끝난 세션(없으면 None)을 돌려줍니다."""
+        with self._session_lock:
+            with self._lock:
+                session, self._session = self._session, None
+            if session is None:
+                return None
+            session.close()
+            self._last_writers = session.writers
+            return session
+
+    def step(self):
+        """
+        모든 카메라에서 프레임을 한 장씩 읽고, 녹화 중이면 저장 대기열에 넣습니다.
+        끊긴 카메라의 자리는 None으로 채운 프레임 리스트를 돌려줍니다.
+        멈추거나 끊긴 카메라가 있어도 한 번에 몇 프레임 간격만 기다립니다.
+        """
+        frames = read_frames(self.sources)
+        connected = [source.connected for source in self.sources]
+        for i, frame in enumerate(frames):
+            if frame is not None:
+                self._fps_counts[i] += 1
+                self._latest_frames[i] = frame
+            elif not connected[i]:
+                self._latest_frames[i] = None
+
+        now = time.monotonic()
+        if now - self._fps_since >= 1.0:
+            self._fps = [count / (now - self._fps_since) for count in self._fps_counts]
+            self._fps_counts = [0] * len(self.sources)
+            self._fps_since = now
+
+        with self._lock:
+            session = self._session
+            if session is None:
+                return frames
+
+            session.frame_count += 1
+            save_image = self.image_capture_interval > 0 and session.frame_count % self.image_capture_interval == 0
+            saved_images = []
+            for i, frame in enumerate(frames):
+                # 끊긴 구간은 빈 프레임 대신 gaps.csv에 기록합니다. 연결된 카메라가 이번에만 새 프레임이 없는 것은 끊김이 아닙니다.
+                session.gap_log.update(self.camera_indices[i], connected[i], session.frame_count)
+                if not connected[i]:
+                    self._missed_frames[i] += 1
+                if frame is None:
+                    continue
+                if save_image or self.save_video:
+                    filename = session.writers[i].put(frame, save_image, self.save_video)
+                    if filename is not None:
+                        saved_images.append((filename, frame))
+
+        # 이번에 저장한 모든 카메라의 이미지를 한 묶음으로 사전 라벨링에 넘깁니다. (밀리면 버려짐)
+        if saved_images and self.prelabel_sink is not None:
+            self.prelabel_sink.submit(saved_images)
+        return frames
+
+    def latest_frame(self, camera_position):
+        """가장 최근에 읽은 (글씨 없는) 프레임. 이번에 새 프레임이 없으면 직전 프레임이고, 끊겨 있으면 None."""
+        return self._latest_frames[camera_position]
+
+    def stats(self):
+        """현재 상태를 JSON으로 바꿀 수 있는 dict로 돌려줍니다."""
+        session = self._session
+        writers = session.writers if session else self._last_writers
+
+        cameras = []
+        for i, index in enumerate(self.camera_indices):
+            source = self.sources[i] if i < len(self.sources) else None
+            writer = writers[i]
+            cameras.append({
+                "index": index,
+                "connected": bool(source and source.connected),
+                "reconnects": source.reconnect_count if source else 0,
+                "fps": round(self._fps[i], 2),
+                "queue_depth": writer.queue_depth() if writer and session else 0,
+                "dropped_frames": writer.dropped_frames if writer else 0,
+                "missed_frames": self._missed_frames[i],
+                "saved_images": writer.saved_images if writer else 0,
+            })
+
+        # 출력 폴더가 아직 없으면 가장 가까운 상위 폴더 기준으로 디스크 사용량을 구합니다.
+        disk_path = os.path.abspath(self.output_dir)
+        while not os.path.exists(disk_path):
+            disk_path = os.path.dirname(disk_path)
+        disk = shutil.disk_usage(disk_path)
+
+        stats = {
+            "recording": session is not None,
+            "session_path": session.path if session else None,
+            "session_frames": session.frame_count if session else 0,
+            "cameras": cameras,
+            "disk": {"total": disk.total, "used": disk.used, "free": disk.free},
+        }
+        if self.prelabel_sink is not None:
+            stats["prelabel"] = self.prelabel_sink.stats()
+        return stats
@@ -0,0 +1,160 @@
+import asyncio
+import cv2
+import json
+import threading
+
+# --- 제어 서버 설정값 ---
+CONTROL_HOST = "127.0.0.1" # 보드 밖에서 접속하려면 SSH 터널을 사용하세요.
+CONTROL_PORT = 8080
+PREVIEW_FPS = 2            # MJPEG 미리보기의 초당 프레임 수 (0이면 미리보기 비활성화)
+PREVIEW_JPEG_QUALITY = 70
+# --- ---
+
+BOUNDARY = "frame"
+
+class ControlServer:
+    """
+    캡처 엔진에 붙는 작은 asyncio HTTP 제어 서버. 별도 스레드의 이벤트 루프에서 동작합니다.
+
+      GET  /status             현재 세션 경로, 카메라별 FPS/대기열/버린 프레임, 디스크 사용량 (JSON)
+      POST /start              녹화 세션 시작
+      POST /stop               녹화 세션 종료
+      POST /trigger            스케줄러의 외부 트리거(ExternalTrigger) 녹화 요청
+      POST /shutdown           프로그램 종료 요청
+      GET  /preview/<카메라번호>  저속 MJPEG 미리보기 (PREVIEW_FPS > 0일 때)
+
+    세션 시작/종료와 JPEG 인코딩은 실행기(executor) 스레드에서 처리하므로
+    이벤트 루프와 캡처 스레드 어느 쪽도 기다리게 하지 않습니다.
+    """
+
+    def __init__(self, engine, host=CONTROL_HOST, port=CONTROL_PORT, preview_fps=PREVIEW_FPS, scheduler=None):
+        self.engine = engine
+        self.scheduler = scheduler
+        self.host = host
+        self.port = port
+        self.preview_fps = preview_fps
+
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._clients = set()
+
+    def start(self):
+        """서버 스레드를 시작하고, 포트가 열릴 때까지 기다립니다. port=0이면 빈 포트를 골라 self.port에 기록합니다."""
+        self._thread = threading.Thread(target=self._run, name="control-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._server is None:
+            return False
+        print(f"제어 서버를 시작했습니다: http://{self.host}:{self.port}/status")
+        return True
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            print(f"오류: 제어 서버를 시작할 수 없습니다. ({e})")
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            # 열려 있는 연결(미리보기 등)을 닫아 처리 중인 핸들러가 스스로 끝나게 한 뒤 루프를 닫습니다.
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            tasks = asyncio.all_tasks(self._loop)
+            if tasks:
+                self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+    def stop(self):
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    async def _handle(self, reader, writer):
+        self._clients.add(writer)
+        try:
+            request_line = await reader.readline()
+            # 헤더는 사용하지 않지만 끝까지 읽어 둡니다.
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2:
+                await self._send_json(writer, 400, {"error": "bad request"})
+                return
+            method, path = parts[0], parts[1].split("?")[0]
+
+            if method == "GET" and path == "/status":
+                await self._send_json(writer, 200, self.engine.stats())
+            elif method == "POST" and path == "/start":
+                session_path = await self._loop.run_in_executor(None, self.engine.start_session)
+                await self._send_json(writer, 200, {"recording": True, "session_path": session_path})
+            elif method == "POST" and path == "/stop":
+                session = await self._loop.run_in_executor(None, self.engine.stop_session)
+                await self._send_json(writer, 200, {"recording": False, "session_path": session.path if session else None})
+            elif method == "POST" and path == "/trigger":
+                if self.scheduler is None or not self.scheduler.fire_triggers():
+                    await self._send_json(writer, 404, {"error": "no external trigger configured"})
+                else:
+                    await self._send_json(writer, 200, {"triggered": True})
+            elif method == "POST" and path == "/shutdown":
+                self.engine.quit_requested = True
+                await self._send_json(writer, 200, {"shutdown": True})
+            elif method == "GET" and path.startswith("/preview/"):
+                await self._preview(writer, path[len("/preview/"):])
+            else:
+                await self._send_json(writer, 404, {"error": "not found"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _send_json(self, writer, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}.get(status, "")
+        writer.write(
+            f"HTTP/1.0 {status} {reason}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def _preview(self, writer, camera):
+        if self.preview_fps <= 0:
+            await self._send_json(writer, 404, {"error": "preview disabled"})
+            return
+        try:
+            position = self.engine.camera_indices.index(int(camera))
+        except ValueError:
+            await self._send_json(writer, 404, {"error": f"unknown camera {camera}"})
+            return
+
+        writer.write(
+            "HTTP/1.0 200 OK\r\n"
+            f"Content-Type: multipart/x-mixed-replace; boundary={BOUNDARY}\r\n\r\n".encode("latin-1")
+        )
+        encode_params = [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY]
+        while not writer.is_closing():
+            frame = self.engine.latest_frame(position)
+            if frame is not None:
+                ok, jpeg = await self._loop.run_in_executor(None, cv2.imencode, ".jpg", frame, encode_params)
+                if ok:
+                    writer.write(
+                        f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode("latin-1")
+                        + jpeg.tobytes() + b"\r\n"
+                    )
+                    await writer.drain()
+            await asyncio.sleep(1.0 / self.preview_fps)
@@ -0,0 +1,249 @@
+import argparse
+import cv2
+import hashlib
+import json
+import numpy as np
+import os
+import re
+import yaml
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from prelabel import PRELABEL_CLASSES
+
+# --- 기본 설정값 ---
+IMGSZ = 640            # 학습 이미지 크기 (정사각형, 비율 유지 후 여백 채움)
+VAL_RATIO = 0.2        # 검증(val) 세트 비율
+SPLIT_BLOCK_FRAMES = 300 # 한 세션에서 이 수만큼 연속된 프레임 번호(모든 카메라 공통)를 묶어 같은 분할(train/val)에 넣습니다.
+CLASS_NAMES = ",".join(PRELABEL_CLASSES) # 쉼표로 구분한 클래스 이름 (사전 라벨 번호와 맞도록 prelabel.py의 클래스 목록을 그대로 사용)
+BATCH_SIZE = 64        # 워커에 한 번에 넘기는 이미지 수 (작업 단위. 이미지는 한 장씩 처리합니다)
+PAD_COLOR = 114        # 레터박스 여백 색 (YOLO 기본값)
+JPEG_QUALITY = 95
+MANIFEST_FILE = "export_manifest.json"
+# --- ---
+
+def find_frames(session_dirs):
+    """
+    세션 폴더 안의 모든 jpg를 찾습니다. (multisave.py의 images/cam_N/, multisave_image.py의 cam_N/, extract_frames.py의 extracted/<설정>/cam_N/,
+    singlesave_image.py의 세션 폴더 모두 지원) 결과는 (원본 경로, 내보낼 이름, 분할 기준) 목록입니다.
+
+    같은 이름의 세션 폴더가 여러 곳에 있을 수 있으므로(예: data_recordings/X와 image_recordings/X,
+    같은 스케줄로 녹화한 여러 보드) 내보낼 이름에는 세션 폴더 실제 경로의 짧은 해시를 붙입니다.
+    """
+    frames = []
+    seen = set()
+    for session_dir in session_dirs:
+        session_dir = os.path.realpath(session_dir)
+        if session_dir in seen:
+            continue
+        seen.add(session_dir)
+        session_id = f"{os.path.basename(session_dir)}_{hashlib.sha1(session_dir.encode('utf-8')).hexdigest()[:6]}"
+        for root, dirs, files in os.walk(session_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.lower().endswith(".jpg"):
+                    continue
+                rel = os.path.relpath(os.path.join(root, name), session_dir)
+                # images/cam_0/frame_000001.jpg -> <세션>_<해시>_cam_0_frame_000001.jpg
+                parts = [p for p in rel.split(os.sep) if p != "images"]
+                frames.append((os.path.join(root, name), "_".join([session_id] + parts), split_key(session_id, name)))
+    return frames
+
+def split_key(session_id, filename):
+    """
+    분할을 정하는 단위. 프레임마다 나누면 바로 옆 프레임이나 같은 순간의 다른 카메라 프레임이
+    train과 val에 흩어져 val이 train의 거의 복사본이 되므로, 세션과 프레임 번호 구간으로 묶습니다.
+    """
+    match = re.search(r"(\d+)\.jpg$", filename, re.IGNORECASE)
+    if match is None:
+        return session_id
+    return f"{session_id}/{int(match.group(1)) // SPLIT_BLOCK_FRAMES}"
+
+def split_of(key, val_ratio):
+    """분할 기준(split_key)의 해시로 train/val을 정합니다. 다시 실행하거나 데이터가 늘어나도 기존 이미지의 분할은 바뀌지 않습니다."""
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return "val" if int.from_bytes(digest[:4], "big") / 2**32 < val_ratio else "train"
+
+def letterbox_geometry(height, width, imgsz):
+    """비율을 유지한 채 imgsz 정사각형에 맞추기 위한 축소 비율, 크기, 여백 위치."""
+    ratio = min(imgsz / height, imgsz / width)
+    new_w, new_h = round(width * ratio), round(height * ratio)
+    return ratio, new_w, new_h, (imgsz - new_w) // 2, (imgsz - new_h) // 2
+
+def letterbox(image, imgsz, canvas):
+    """
+    비율을 유지한 채 이미지를 imgsz 정사각형 canvas에 넣고 나머지를 여백 색으로 채웁니다.
+    canvas는 워커가 계속 다시 쓰는 버퍼이며, 라벨 변환에 쓸 (축소 비율, 왼쪽, 위쪽 여백)을 돌려줍니다.
+    """
+    ratio, new_w, new_h, left, top = letterbox_geometry(image.shape[0], image.shape[1], imgsz)
+    interpolation = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR
+    canvas.fill(PAD_COLOR)
+    canvas[top : top + new_h, left : left + new_w] = cv2.resize(image, (new_w, new_h), interpolation=interpolation)
+    return ratio, left, top
+
+def convert_labels(label_path, shape, ratio, left, top, imgsz):
+    """원본 이미지 기준 YOLO 라벨(정규화 좌표)을 레터박스된 이미지 기준으로 바꿉니다."""
+    height, width = shape
+    lines = []
+    with open(label_path) as f:
+        for line in f:
+            values = line.split()
+            if len(values) < 5:
+                continue
+            cls, x, y, w, h = values[0], *(float(v) for v in values[1:5])
+            x = (x * width * ratio + left) / imgsz
+            y = (y * height * ratio + top) / imgsz
+            w = w * width * ratio / imgsz
+            h = h * height * ratio / imgsz
+            lines.append(f"{cls} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n")
+    return lines
+
+def export_paths(output_dir, export_name, split):
+    """내보낸 이미지와 라벨 파일의 경로."""
+    image_path = os.path.join(output_dir, "images", split, export_name)
+    label_path = os.path.join(output_dir, "labels", split, os.path.splitext(export_name)[0] + ".txt")
+    return image_path, label_path
+
+def remove_export(output_dir, export_name, split):
+    for path in export_paths(output_dir, export_name, split):
+        if os.path.exists(path):
+            os.remove(path)
+
+def export_batch(items, output_dir, imgsz):
+    """
+    프로세스 풀의 워커에서 실행됩니다. items는 (원본 경로, 내보낼 이름, 분할, 서명) 목록입니다.
+    이미지는 한 장씩 읽어 imgsz 크기 버퍼 하나에 레터박스한 뒤 바로 저장하므로, 워커의 메모리 사용량은 묶음 크기와 상관없습니다.
+    """
+    cv2.setNumThreads(1)
+    canvas = np.empty((imgsz, imgsz, 3), dtype=np.uint8)
+    encode_params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
+    done = []
+    for source, export_name, split, signature in items:
+        image = cv2.imread(source)
+        if image is None:
+            continue
+        ratio, left, top = letterbox(image, imgsz, canvas)
+        image_dest, label_dest = export_paths(output_dir, export_name, split)
+        cv2.imwrite(image_dest, canvas, encode_params)
+
+        # 원본 옆에 라벨(.txt)이 있으면 (예: prelabel 초안) 좌표를 맞춰 함께 내보냅니다.
+        label_source = os.path.splitext(source)[0] + ".txt"
+        if os.path.exists(label_source):
+            with open(label_dest, "w") as f:
+                f.writelines(convert_labels(label_source, image.shape[:2], ratio, left, top, imgsz))
+        elif os.path.exists(label_dest):
+            os.remove(label_dest)
+        done.append((source, export_name, split, signature))
+    return done
+
+def signature_of(path):
+    stat = os.stat(path)
+    label_path = os.path.splitext(path)[0] + ".txt"
+    label_mtime = os.stat(label_path).st_mtime_ns if os.path.exists(label_path) else 0
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{label_mtime}"
+
+def load_manifest(path, imgsz):
+    """
+    내보낸 이미지 목록을 불러옵니다. files는 내보낼 이름마다 원본 경로, 분할(train/val), 서명을 기록합니다.
+    """
+    if not os.path.exists(path):
+        return {"imgsz": imgsz, "val_ratio": None, "files": {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    # 이미지 크기가 바뀌면 기존 결과는 쓸 수 없으므로 모두 다시 만듭니다.
+    # 이미 내보낸 파일을 지울 수 있도록 목록은 남기고 서명만 지웁니다.
+    if manifest.get("imgsz") != imgsz:
+        manifest["imgsz"] = imgsz
+        for entry in manifest["files"].values():
+            entry["signature"] = None
+    return manifest
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def write_dataset_yaml(output_dir, class_names):
+    data = {
+        "path": os.path.abspath(output_dir),
+        "train": "images/train",
+        "val": "images/val",
+        "names": {i: name for i, name in enumerate(class_names)},
+    }
+    yaml_path = os.path.join(output_dir, "dataset.yaml")
+    with open(yaml_path, "w") as f:
+        yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
+    return yaml_path
+
+def main():
+    parser = argparse.ArgumentParser(description="녹화 세션의 이미지를 YOLO 학습용 폴더 구조(images/train, images/val, dataset.yaml)로 내보냅니다.")
+    parser.add_argument("sessions", nargs="+", help="세션 폴더 (예: data_recordings/20250101_120000)")
+    parser.add_argument("--output", default="yolo_dataset", help="내보낼 폴더 (기본값: yolo_dataset)")
+    parser.add_argument("--imgsz", type=int, default=IMGSZ, help=f"학습 이미지 크기 (기본값: {IMGSZ})")
+    parser.add_argument("--val-ratio", type=float, default=VAL_RATIO, help=f"검증 세트 비율 (기본값: {VAL_RATIO})")
+    parser.add_argument("--names", default=CLASS_NAMES, help=f"쉼표로 구분한 클래스 이름 (기본값: {CLASS_NAMES})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="동시에 실행할 프로세스 수")
+    args = parser.parse_args()
+
+    frames = find_frames(args.sessions)
+    if not frames:
+        print("오류: 내보낼 이미지가 없습니다. 세션 폴더 경로를 확인하세요.")
+        return
+
+    for kind in ("images", "labels"):
+        for split in ("train", "val"):
+            os.makedirs(os.path.join(args.output, kind, split), exist_ok=True)
+
+    manifest_path = os.path.join(args.output, MANIFEST_FILE)
+    manifest = load_manifest(manifest_path, args.imgsz)
+
+    files = manifest["files"]
+    manifest["val_ratio"] = args.val_ratio
+
+    # 원본이 지워졌거나 같은 원본이 다른 이름으로 내보내지는 이미지는 이전 결과를 지웁니다.
+    names_by_source = {os.path.abspath(source): export_name for source, export_name, _ in frames}
+    for export_name, entry in list(files.items()):
+        if not os.path.exists(entry["source"]) or names_by_source.get(entry["source"], export_name) != export_name:
+            remove_export(args.output, export_name, entry["split"])
+            del files[export_name]
+
+    # 이미 내보냈고 원본이 그대로인 이미지는 건너뜁니다.
+    # --val-ratio가 바뀌어 분할이 달라진 이미지는 이전 분할의 이미지/라벨을 지운 뒤 다시 내보냅니다.
+    pending = []
+    for source, export_name, key in frames:
+        split = split_of(key, args.val_ratio)
+        signature = signature_of(source)
+        entry = files.get(export_name)
+        if entry is not None and entry["split"] != split:
+            remove_export(args.output, export_name, entry["split"])
+            del files[export_name]
+            entry = None
+        if entry is not None and entry["signature"] == signature and os.path.exists(export_paths(args.output, export_name, split)[0]):
+            continue
+        pending.append((source, export_name, split, signature))
+    save_manifest(manifest_path, manifest)
+
+    print(f"이미지 {len(frames)}개 중 {len(pending)}개를 {args.imgsz}x{args.imgsz}로 내보냅니다. (이미 완료: {len(frames) - len(pending)}개)")
+
+    if pending:
+        batches = [pending[i : i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+        exported = 0
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(export_batch, batch, args.output, args.imgsz) for batch in batches]
+            for done_batches, future in enumerate(as_completed(futures), 1):
+                for source, export_name, split, signature in future.result():
+                    files[export_name] = {"source": os.path.abspath(source), "split": split, "signature": signature}
+                    exported += 1
+                # 중간에 멈춰도 다시 실행하면 이어서 처리할 수 있도록 묶음마다 기록합니다.
+                save_manifest(manifest_path, manifest)
+                print(f"\r진행: {exported}/{len(pending)}", end="", flush=True)
+        print()
+
+    yaml_path = write_dataset_yaml(args.output, [name.strip() for name in args.names.split(",") if name.strip()])
+    train_count = len(os.listdir(os.path.join(args.output, "images", "train")))
+    val_count = len(os.listdir(os.path.join(args.output, "images", "val")))
+    print(f"\n--- 내보내기 결과 ---")
+    print(f"train: {train_count}개, val: {val_count}개")
+    print(f"데이터셋 설정 파일: '{yaml_path}'")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import argparse
+import cv2
+import glob
+import hashlib
+import io
+import json
+import os
+import tarfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# --- 기본 설정값 ---
+TARGET_FPS = 2          # 초당 추출할 이미지 수
+SCENE_THRESHOLD = 0.0   # 0보다 크면 FPS 대신 장면 변화(0~255 평균 밝기 차이) 기준으로 추출
+CHUNK_SECONDS = 0       # 0보다 크면 영상을 이 길이(초)로 나눠 여러 프로세스가 동시에 처리
+JPEG_QUALITY = 95
+SEEK_THRESHOLD = 30     # 다음 추출 프레임까지 이 수 이상 떨어져 있으면 디코딩 대신 키프레임 탐색(seek)
+PROGRESS_FILE = "extract_progress.json"
+EXTRACT_DIR = "extracted" # 세션 폴더 안의 저장 폴더 이름 (녹화 중 저장한 images/cam_N과 섞이지 않도록 따로 둡니다)
+# --- ---
+
+def find_videos(inputs):
+    """세션 폴더(cam_N.mp4가 들어 있는 폴더) 또는 영상 파일 경로 목록에서 영상 파일을 찾습니다."""
+    videos = []
+    for path in inputs:
+        if os.path.isdir(path):
+            videos.extend(sorted(glob.glob(os.path.join(path, "*.mp4"))))
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            print(f"경고: '{path}'를 찾을 수 없어 건너뜁니다.")
+    return videos
+
+def parse_crop(text):
+    if not text:
+        return None
+    x, y, w, h = (int(v) for v in text.split(","))
+    return (x, y, w, h)
+
+def session_output_dir(video_path, output_dir):
+    """
+    영상이 속한 세션의 저장 위치. 기본값은 영상이 있는 세션 폴더이고,
+    --output을 주면 세션마다 <output>/<세션 이름> 폴더를 따로 만들어 cam_N끼리 겹치지 않게 합니다.
+    """
+    session_dir = os.path.dirname(os.path.abspath(video_path))
+    if output_dir is None:
+        return session_dir
+    return os.path.join(output_dir, os.path.basename(session_dir))
+
+def settings_dir_name(target_fps, scene_threshold, crop, shards):
+    """
+    추출 설정마다 따로 쓰는 폴더 이름 (예: fps2, scene8_crop40_40_400_400, fps2_tar).
+    설정을 바꿔 다시 추출해도 이전 설정의 이미지와 섞이지 않습니다.
+    """
+    name = f"scene{scene_threshold:g}" if scene_threshold > 0 else f"fps{target_fps:g}"
+    if crop is not None:
+        name += "_crop" + "_".join(str(v) for v in crop)
+    if shards:
+        name += "_tar"
+    return name
+
+def plan_jobs(video_path, output_dir, target_fps, scene_threshold, chunk_seconds, crop, shards):
+    """영상 하나를 작업 단위(영상 전체 또는 구간)로 나눕니다."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"오류: '{video_path}'를 열 수 없습니다.")
+        return []
+    source_fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frame_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    camera_name = os.path.splitext(os.path.basename(video_path))[0]
+    settings_dir = settings_dir_name(target_fps, scene_threshold, crop, shards)
+    image_dir = os.path.join(session_output_dir(video_path, output_dir), EXTRACT_DIR, settings_dir, camera_name)
+
+    # 장면 변화 기준은 앞 프레임과 비교해야 하므로 영상 하나를 한 작업으로 처리합니다.
+    ranges = [(0, None)]
+    if chunk_seconds > 0 and scene_threshold <= 0 and frame_total > 0:
+        chunk_frames = max(1, int(chunk_seconds * source_fps))
+        ranges = [(start, min(start + chunk_frames, frame_total)) for start in range(0, frame_total, chunk_frames)]
+        ranges[-1] = (ranges[-1][0], None) # 프레임 수 정보가 부정확할 수 있으므로 마지막 구간은 끝까지 읽습니다.
+
+    params = f"{target_fps}|{scene_threshold}|{crop}|{shards}|{JPEG_QUALITY}"
+    jobs = []
+    for chunk_id, (start, end) in enumerate(ranges):
+        key_source = f"{os.path.abspath(video_path)}|{os.path.getsize(video_path)}|{start}|{end}|{params}"
+        jobs.append({
+            "key": hashlib.sha1(key_source.encode("utf-8")).hexdigest(),
+            "video": video_path,
+            "image_dir": image_dir,
+            "chunk_id": chunk_id,
+            "start": start,
+            "end": end,
+            "source_fps": source_fps,
+            "target_fps": target_fps,
+            "scene_threshold": scene_threshold,
+            "crop": crop,
+            "shards": shards,
+        })
+    return jobs
+
+class FrameSink:
+    """추출한 프레임을 frame_%06d.jpg 파일 또는 tar 묶음(shard)으로 저장합니다."""
+
+    def __init__(self, image_dir, chunk_id, shards):
+        os.makedirs(image_dir, exist_ok=True)
+        self.image_dir = image_dir
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
+        self.count = 0
+        self._tar = None
+        if shards:
+            self._shard_path = os.path.join(image_dir, f"shard_{chunk_id:04d}.tar")
+            # 중간에 끊겨도 깨진 shard가 남지 않도록 임시 파일에 쓴 뒤 이름을 바꿉니다.
+            self._tar = tarfile.open(self._shard_path + ".tmp", "w")
+
+    def write(self, frame_number, frame):
+        name = f"frame_{frame_number:06d}.jpg"
+        if self._tar is None:
+            cv2.imwrite(os.path.join(self.image_dir, name), frame, self.encode_params)
+        else:
+            ok, jpeg = cv2.imencode(".jpg", frame, self.encode_params)
+            data = jpeg.tobytes()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            self._tar.addfile(info, io.BytesIO(data))
+        self.count += 1
+
+    def close(self):
+        if self._tar is not None:
+            self._tar.close()
+            os.replace(self._shard_path + ".tmp", self._shard_path)
+
+def _crop(frame, crop):
+    if crop is None:
+        return frame
+    x, y, w, h = crop
+    return frame[y : y + h, x : x + w]
+
+def _extract_by_fps(cap, job, sink):
+    """target_fps 간격의 프레임만 디코딩합니다. 멀리 떨어진 프레임은 키프레임 탐색으로 건너뜁니다."""
+    step = job["source_fps"] / job["target_fps"]
+    start, end = job["start"], job["end"]
+
+    # 이 구간에 속하는 첫 번째 추출 번호(k)를 계산합니다. 파일 이름 번호는 k + 1 입니다.
+    k = int(start / step)
+    while round(k * step) < start:
+        k += 1
+
+    position = start
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    while True:
+        target = round(k * step)
+        if end is not None and target >= end:
+            break
+        if target - position > SEEK_THRESHOLD:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            position = target
+        while position < target:
+            if not cap.grab():
+                return
+            position += 1
+        ret, frame = cap.read()
+        if not ret:
+            return
+        position += 1
+        sink.write(k + 1, _crop(frame, job["crop"]))
+        k += 1
+
+def _extract_by_scene(cap, job, sink):
+    """앞서 저장한 프레임과 충분히 달라졌을 때만 저장합니다."""
+    last_small = None
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            return
+        frame = _crop(frame, job["crop"])
+        small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (64, 64), interpolation=cv2.INTER_AREA)
+        if last_small is None or cv2.absdiff(small, last_small).mean() >= job["scene_threshold"]:
+            sink.write(sink.count + 1, frame)
+            last_small = small
+
+def extract_job(job):
+    """작업 하나(영상 전체 또는 구간)를 처리합니다. 프로세스 풀의 워커에서 실행됩니다."""
+    cv2.setNumThreads(1) # 워커마다 코어 하나씩 쓰도록 OpenCV 내부 스레드를 끕니다.
+    cap = cv2.VideoCapture(job["video"])
+    if not cap.isOpened():
+        return job["key"], -1
+
+    sink = FrameSink(job["image_dir"], job["chunk_id"], job["shards"])
+    try:
+        if job["scene_threshold"] > 0:
+            _extract_by_scene(cap, job, sink)
+        else:
+            _extract_by_fps(cap, job, sink)
+    finally:
+        cap.release()
+    sink.close()
+    return job["key"], sink.count
+
+def load_progress(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_progress(path, progress):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(progress, f, indent=1)
+    os.replace(tmp_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description=f"녹화된 cam_N.mp4 영상에서 {EXTRACT_DIR}/<설정>/cam_N/frame_%06d.jpg 이미지를 병렬로 추출합니다.")
+    parser.add_argument("inputs", nargs="+", help="세션 폴더(예: video_recordings/20250101_120000) 또는 mp4 파일")
+    parser.add_argument("--fps", type=float, default=TARGET_FPS, help=f"초당 추출할 이미지 수 (기본값: {TARGET_FPS})")
+    parser.add_argument("--scene", type=float, default=SCENE_THRESHOLD, help="장면 변화 기준으로 추출 (평균 밝기 차이, 예: 8)")
+    parser.add_argument("--crop", default=None, help="잘라낼 영역 x,y,w,h (예: 40,40,400,400)")
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS, help="긴 영상을 이 길이(초)로 나눠 병렬 처리")
+    parser.add_argument("--shards", action="store_true", help="낱장 jpg 대신 구간별 tar 묶음(shard_%%04d.tar)으로 저장")
+    parser.add_argument("--output", default=None, help="저장 폴더. 세션마다 <output>/<세션 이름>/ 아래에 저장합니다. (기본값: 각 영상이 있는 세션 폴더)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="동시에 실행할 프로세스 수")
+    args = parser.parse_args()
+
+    if args.scene <= 0 and args.fps <= 0:
+        print("오류: --fps 또는 --scene 중 하나는 0보다 커야 합니다.")
+        return
+
+    crop = parse_crop(args.crop)
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("오류: 처리할 영상이 없습니다.")
+        return
+
+    # 서로 다른 폴더의 세션이 같은 이름이면 --output 아래에서 같은 폴더를 쓰게 되므로 미리 막습니다.
+    session_dirs = {}
+    for video in videos:
+        output_root = session_output_dir(video, args.output)
+        session_dir = os.path.dirname(os.path.abspath(video))
+        if session_dirs.setdefault(output_root, session_dir) != session_dir:
+            print(f"오류: '{session_dirs[output_root]}'와 '{session_dir}'가 모두 '{output_root}'에 저장됩니다. 세션을 나눠서 실행하세요.")
+            return
+
+    jobs = []
+    for video in videos:
+        jobs.extend(plan_jobs(video, args.output, args.fps, args.scene, args.chunk_seconds, crop, args.shards))
+
+    # 진행 상황은 설정별 저장 폴더(extracted/<설정>/)마다 기록하며, 다시 실행하면 끝난 작업은 건너뜁니다.
+    progress_paths = {}
+    for job in jobs:
+        settings_root = os.path.dirname(job["image_dir"])
+        progress_paths.setdefault(settings_root, os.path.join(settings_root, PROGRESS_FILE))
+    progress = {path: load_progress(path) for path in progress_paths.values()}
+
+    pending = []
+    for job in jobs:
+        progress_path = progress_paths[os.path.dirname(job["image_dir"])]
+        if job["key"] in progress[progress_path]:
+            continue
+        pending.append((job, progress_path))
+
+    print(f"영상 {len(videos)}개, 작업 {len(jobs)}개 중 {len(pending)}개를 처리합니다. (이미 완료: {len(jobs) - len(pending)}개)")
+    if not pending:
+        return
+
+    total_saved = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(extract_job, job): (job, progress_path) for job, progress_path in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            job, progress_path = futures[future]
+            key, count = future.result()
+            if count < 0:
+                print(f"오류: '{job['video']}'를 열 수 없습니다.")
+                continue
+            total_saved += count
+            progress[progress_path][key] = {"video": job["video"], "chunk": job["chunk_id"], "frames": count}
+            save_progress(progress_path, progress[progress_path])
+            print(f"[{done}/{len(pending)}] {job['video']} (구간 {job['chunk_id']}): {count}개 저장")
+
+    print(f"\n총 {total_saved}개의 이미지를 추출했습니다.")
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 import cv2
 import os
-import numpy as np
 from datetime import datetime
+from camera_source import open_cameras, read_frames, no_signal_frame, GapLog
 
 # --- 설정값 ---
 CAMERA_INDICES = [0, 2] # 예시: 0번, 2번 카메라 사용
@@ -16,78 +16,45 @@ MAIN_OUTPUT_DIR = "video_recordings" # 저장 폴더
 SAVE_FPS = 10 # 저장될 영상의 초당 프레임 수
 # --- ---
 
-def gstreamer_pipeline(sensor_id, capture_width, capture_height, framerate=30):
-    """Jetson Nano의 CSI 카메라를 위한 GStreamer 파이프라인"""
-    return (
-        f"nvarguscamerasrc sensor-id={sensor_id} ! "
-        f"video/x-raw(memory:NVMM), width=(int){capture_width}, height=(int){capture_height}, framerate=(fraction){framerate}/1 ! "
-        "nvvidconv flip-method=0 ! "
-        "video/x-raw, format=(string)BGRx ! "
-        "videoconvert ! "
-        "video/x-raw, format=(string)BGR ! appsink"
-    )
-
 def main():
     if len(CAMERA_INDICES) < 2:
         print("오류: 카메라를 2대 이상 지정해주세요. (CAMERA_INDICES 리스트 수정)")
         return
 
-    caps = []
-    crop_coords = []
-
-    for index in CAMERA_INDICES:
-        if IS_CSI_CAMERA:
-            pipeline = gstreamer_pipeline(index, CAPTURE_WIDTH, CAPTURE_HEIGHT)
-            cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
-            print(f"CSI 카메라 #{index} (GStreamer) 모드로 {CAPTURE_WIDTH}x{CAPTURE_HEIGHT} 해상도를 요청합니다.")
-        else:
-            cap = cv2.VideoCapture(index)
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_WIDTH)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_HEIGHT)
-            print(f"USB 카메라 #{index} 모드로 {CAPTURE_WIDTH}x{CAPTURE_HEIGHT} 해상도를 요청합니다.")
-
-        if not cap.isOpened():
-            print(f"오류: 카메라 #{index}를 열 수 없습니다. 연결을 확인하세요.")
-            for c in caps: c.release()
-            return
-        
-        actual_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        actual_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
-        if actual_width < CAPTURE_WIDTH or actual_height < CAPTURE_HEIGHT:
-            print(f"오류: 카메라 #{index}의 실제 해상도({actual_width}x{actual_height})가 원하는 크기보다 작습니다.")
-            for c in caps: c.release()
-            return
-            
-        crop_x = (actual_width - CAPTURE_WIDTH) // 2
-        crop_y = (actual_height - CAPTURE_HEIGHT) // 2
-        
-        caps.append(cap)
-        crop_coords.append((crop_x, crop_y))
+    sources = open_cameras(CAMERA_INDICES, CAPTURE_WIDTH, CAPTURE_HEIGHT, IS_CSI_CAMERA)
+    if not sources:
+        return
 
-    print(f"\n총 {len(caps)}대의 카메라 설정 완료. 라이브 영상을 시작합니다.")
+    print(f"\n총 {len(sources)}대의 카메라 설정 완료. 라이브 영상을 시작합니다.")
     print("엔터를 누르면 영상 녹화가 시작됩니다.")
 
     is_recording = False
     video_writers = []
     base_save_path = ""
+    frame_count = 0
+    gap_log = None
+    last_frames = [None] * len(sources) # 화면 표시용 직전 프레임
 
     try:
         while True:
             clean_frames_for_saving = []
             frames_for_display = []
             
-            for i, cap in enumerate(caps):
-                ret, frame = cap.read()
-                if not ret:
-                    print(f"오류: 카메라 #{CAMERA_INDICES[i]}에서 프레임을 읽을 수 없습니다.")
-                    frame = np.zeros((CAPTURE_HEIGHT, CAPTURE_WIDTH, 3), dtype=np.uint8)
-
-                crop_x, crop_y = crop_coords[i]
-                cropped_frame = frame[crop_y : crop_y + CAPTURE_HEIGHT, crop_x : crop_x + CAPTURE_WIDTH]
+            # 카메라가 멈추거나 끊겨도 다른 카메라가 오래 기다리지 않도록 한꺼번에 읽습니다.
+            for i, cropped_frame in enumerate(read_frames(sources)):
+                ret = cropped_frame is not None
 
                 clean_frames_for_saving.append(cropped_frame)
-                display_frame = cropped_frame.copy()
+                # 연결된 카메라가 이번에만 새 프레임이 없으면 직전 프레임을 그대로 보여줍니다.
+                if ret:
+                    last_frames[i] = cropped_frame
+                elif not sources[i].connected:
+                    last_frames[i] = None
+                if last_frames[i] is not None:
+                    display_frame = last_frames[i].copy()
+                else:
+                    # 끊긴 카메라는 화면에만 빈 프레임을 보여주고 저장하지 않습니다.
+                    display_frame = no_signal_frame(CAPTURE_WIDTH, CAPTURE_HEIGHT)
                 
                 cam_label = f"CAM {CAMERA_INDICES[i]}"
                 cv2.putText(display_frame, cam_label, (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
@@ -116,6 +83,7 @@ def main():
                     current_time_str = datetime.now().strftime("%Y%m%d_%H%M%S")
                     base_save_path = os.path.join(MAIN_OUTPUT_DIR, current_time_str)
                     os.makedirs(base_save_path, exist_ok=True)
+                    gap_log = GapLog(base_save_path)
                     
                     video_writers = []
                     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
@@ -131,13 +99,17 @@ def main():
                     break
 
             if is_recording:
+                frame_count += 1
                 for i, clean_frame in enumerate(clean_frames_for_saving):
-                    if i < len(video_writers):
+                    gap_log.update(CAMERA_INDICES[i], sources[i].connected, frame_count)
+                    if clean_frame is not None and i < len(video_writers):
                         video_writers[i].write(clean_frame)
 
     finally:
-        for cap in caps:
-            cap.release()
+        for source in sources:
+            source.stop()
+        if gap_log:
+            gap_log.close(frame_count)
         for writer in video_writers:
             writer.release()
         cv2.destroyAllWindows()
@@ -145,6 +117,8 @@ def main():
         if is_recording and base_save_path:
             print("\n--- 저장 결과 ---")
             print(f"모든 카메라의 영상이 '{base_save_path}' 폴더에 저장되었습니다.")
+            if gap_log.gap_count > 0:
+                print(f"카메라 연결이 끊긴 구간 {gap_log.gap_count}개를 '{gap_log.path}'에 기록했습니다.")
         print("\n프로그램을 종료했습니다.")
 
 if __name__ == '__main__':
@@ -0,0 +1,169 @@
+import numpy as np
+import os
+import queue
+import threading
+import time
+
+# --- 사전 라벨링 설정값 ---
+PRELABEL_MODEL = "ssdlite320_mobilenet_v3_large" # torchvision 검출 모델 이름 (예: fasterrcnn_mobilenet_v3_large_320_fpn)
+PRELABEL_WEIGHTS = "DEFAULT"  # torchvision 사전학습 가중치 (None이면 무작위 초기화, 동작 확인용)
+PRELABEL_CLASSES = ["person"] # 라벨로 남길 COCO 클래스 이름. 순서가 YOLO 클래스 번호가 됩니다. (export_yolo.py --names의 기본값)
+PRELABEL_CONF = 0.4           # 이 점수 이상인 검출만 라벨로 남깁니다.
+PRELABEL_FPS = 1.0            # 초당 최대 추론 횟수 (한 번에 모든 카메라의 이미지를 묶어서 추론)
+PRELABEL_DEVICE = "auto"      # "auto"면 CUDA가 있으면 GPU, 없으면 CPU
+PRELABEL_CPU_THREADS = 2      # CPU로 추론할 때 쓸 스레드 수 (캡처/저장에 쓸 코어를 남겨 둡니다)
+# --- ---
+
+def load_detector(model_name=PRELABEL_MODEL, weights=PRELABEL_WEIGHTS, device=PRELABEL_DEVICE):
+    """
+    torchvision 검출 모델과 클래스 이름 목록을 불러옵니다.
+    torch/torchvision이 없으면 (None, None, None)을 돌려주며, 이때 사전 라벨링은 꺼집니다.
+    """
+    try:
+        import torch
+        import torchvision
+    except ImportError:
+        print("경고: torch/torchvision이 설치되어 있지 않아 사전 라벨링을 사용할 수 없습니다.")
+        return None, None, None
+
+    if device == "auto":
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    if device == "cpu":
+        torch.set_num_threads(PRELABEL_CPU_THREADS)
+
+    try:
+        model = torchvision.models.get_model(model_name, weights=weights, weights_backbone=None)
+    except Exception as e:
+        # 가중치를 내려받지 못하는 경우(오프라인 등)에도 캡처는 계속되도록 사전 라벨링만 끕니다.
+        print(f"경고: 사전 라벨링 모델 '{model_name}'을(를) 불러올 수 없습니다. ({e})")
+        return None, None, None
+    if weights is not None:
+        categories = torchvision.models.get_model_weights(model_name).DEFAULT.meta["categories"]
+    else:
+        categories = [f"class_{i}" for i in range(91)]
+    model.eval().to(device)
+    return model, categories, device
+
+class PrelabelSink:
+    """
+    캡처 중 저장되는 이미지(frame_%06d.jpg) 옆에 YOLO 형식 초안 라벨(.txt)을 만드는 추론 스레드.
+
+    캡처 엔진은 한 번 저장할 때마다 모든 카메라의 이미지를 submit()으로 한 묶음씩 넘기고,
+    추론 스레드는 묶음 전체를 한 번의 모델 호출로 처리합니다. 추론이 밀리거나 PRELABEL_FPS보다
+    자주 들어온 묶음은 기다리지 않고 버리므로 캡처 루프는 절대 느려지지 않습니다.
+    """
+
+    def __init__(self, model, categories, device, classes=PRELABEL_CLASSES, conf=PRELABEL_CONF, max_fps=PRELABEL_FPS):
+        self.model = model
+        self.device = device
+        self.conf = conf
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+
+        # COCO 클래스 번호 -> YOLO 클래스 번호 (PRELABEL_CLASSES 순서)
+        self.class_map = {}
+        for yolo_id, name in enumerate(classes):
+            if name in categories:
+                self.class_map[categories.index(name)] = yolo_id
+            else:
+                print(f"경고: 사전 라벨링 모델에 '{name}' 클래스가 없습니다.")
+
+        # 개수는 캡처 스레드(submit)와 추론 스레드 양쪽에서 늘어나고 stats()에서 함께 읽으므로 잠금을 걸고 셉니다.
+        self.labeled_images = 0
+        self.skipped_images = 0 # PRELABEL_FPS 제한으로 일부러 건너뛴 이미지
+        self.dropped_images = 0 # 앞 묶음의 추론이 끝나지 않아(밀려서) 버린 이미지
+        self.failed_images = 0  # 추론 중 오류가 난 이미지
+        self._count_lock = threading.Lock()
+        self._last_accepted = 0.0
+        self._queue = queue.Queue(maxsize=1) # 추론 중일 때 기다리는 묶음은 최대 하나
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="prelabel", daemon=True)
+        self._thread.start()
+
+    def submit(self, items):
+        """items는 (이미지 경로, 프레임) 목록입니다. 캡처 스레드에서 호출되며 절대 기다리지 않습니다."""
+        now = time.monotonic()
+        if now - self._last_accepted < self.min_interval:
+            with self._count_lock:
+                self.skipped_images += len(items)
+            return False
+        try:
+            self._queue.put_nowait(items)
+        except queue.Full:
+            with self._count_lock:
+                self.dropped_images += len(items)
+            return False
+        self._last_accepted = now
+        return True
+
+    def _run(self):
+        import torch
+
+        while not self._stop_event.is_set():
+            try:
+                items = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # 같은 크기의 프레임을 한 배열로 쌓아 BGR->RGB, HWC->CHW, 0~1 변환을 한 번에 처리합니다.
+            try:
+                batch = torch.from_numpy(np.stack([frame for _, frame in items]))
+                batch = batch.to(self.device).flip(-1).permute(0, 3, 1, 2).float().div_(255)
+                with torch.inference_mode():
+                    outputs = self.model(list(batch))
+            except Exception as e:
+                print(f"경고: 사전 라벨링 추론에 실패했습니다. ({e})")
+                with self._count_lock:
+                    self.failed_images += len(items)
+                continue
+
+            height, width = batch.shape[2], batch.shape[3]
+            for (image_path, _), output in zip(items, outputs):
+                self._write_labels(image_path, output, width, height)
+            with self._count_lock:
+                self.labeled_images += len(items)
+
+    def _write_labels(self, image_path, output, width, height):
+        lines = []
+        boxes = output["boxes"].cpu().numpy()
+        labels = output["labels"].cpu().numpy()
+        scores = output["scores"].cpu().numpy()
+        for (x1, y1, x2, y2), label, score in zip(boxes, labels, scores):
+            if score < self.conf or int(label) not in self.class_map:
+                continue
+            x_center = (x1 + x2) / 2 / width
+            y_center = (y1 + y2) / 2 / height
+            box_w = (x2 - x1) / width
+            box_h = (y2 - y1) / height
+            lines.append(f"{self.class_map[int(label)]} {x_center:.6f} {y_center:.6f} {box_w:.6f} {box_h:.6f}\n")
+
+        # 검출이 없어도 빈 라벨 파일을 남겨, 추론을 거친 이미지(배경)임을 구분할 수 있게 합니다.
+        with open(os.path.splitext(image_path)[0] + ".txt", "w") as f:
+            f.writelines(lines)
+
+    def stats(self):
+        with self._count_lock:
+            counts = {
+                "labeled_images": self.labeled_images,
+                "skipped_images": self.skipped_images,
+                "dropped_images": self.dropped_images,
+                "failed_images": self.failed_images,
+            }
+        return {
+            **counts,
+            "pending_batches": self._queue.qsize(),
+        }
+
+    def stop(self):
+        """대기 중인 묶음까지 처리한 뒤 추론 스레드를 종료합니다."""
+        while not self._queue.empty() and self._thread.is_alive():
+            time.sleep(0.05)
+        self._stop_event.set()
+        self._thread.join()
+
+def create_prelabel_sink():
+    """설정값으로 모델을 불러와 PrelabelSink를 만듭니다. 사용할 수 없으면 None을 돌려줍니다."""
+    model, categories, device = load_detector()
+    if model is None:
+        return None
+    print(f"사전 라벨링 모델 '{PRELABEL_MODEL}'을(를) {device}에서 실행합니다. (클래스: {', '.join(PRELABEL_CLASSES)})")
+    return PrelabelSink(model, categories, device)
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+# --- 스케줄러 설정값 ---
+SCHEDULER_POLL_INTERVAL = 0.2 # 스케줄을 확인하는 간격(초)
+# --- ---
+
+def _parse_hhmm(text):
+    hour, minute = text.split(":")
+    return int(hour) * 60 + int(minute)
+
+class TimeWindow:
+    """매일 start~end("HH:MM") 사이에 녹화합니다. end가 start보다 이르면 자정을 넘기는 구간으로 봅니다."""
+
+    def __init__(self, start, end):
+        self.start = _parse_hhmm(start)
+        self.end = _parse_hhmm(end)
+        self.label = f"time window {start}-{end}"
+
+    def is_active(self, now, elapsed):
+        minutes = now.hour * 60 + now.minute
+        if self.start <= self.end:
+            return self.start <= minutes < self.end
+        return minutes >= self.start or minutes < self.end
+
+class DutyCycle:
+    """
+    period_seconds마다 record_seconds 동안 녹화합니다. (예: 5분마다 30초 -> DutyCycle(30, 300))
+    during에 TimeWindow를 주면 그 시간대 안에서만 동작합니다.
+    """
+
+    def __init__(self, record_seconds, period_seconds, during=None):
+        if record_seconds <= 0 or period_seconds < record_seconds:
+            raise ValueError("DutyCycle: 0 < record_seconds <= period_seconds 이어야 합니다.")
+        self.record_seconds = record_seconds
+        self.period_seconds = period_seconds
+        self.during = during
+        self.label = f"duty cycle {record_seconds}s/{period_seconds}s"
+
+    def is_active(self, now, elapsed):
+        if self.during is not None and not self.during.is_active(now, elapsed):
+            return False
+        return elapsed % self.period_seconds < self.record_seconds
+
+class ExternalTrigger:
+    """
+    외부 신호가 들어오면 record_seconds 동안 녹화합니다. 녹화 중 다시 신호가 오면 그때부터 다시 연장됩니다.
+    신호는 fire() 호출(제어 서버의 POST /trigger) 또는 trigger_file 생성(예: GPIO 스크립트에서 touch)으로 보냅니다.
+    """
+
+    def __init__(self, record_seconds, trigger_file=None):
+        self.record_seconds = record_seconds
+        self.trigger_file = trigger_file
+        self.label = f"external trigger {record_seconds}s"
+        self._until = 0.0
+        self._lock = threading.Lock()
+
+    def fire(self):
+        with self._lock:
+            self._until = time.monotonic() + self.record_seconds
+
+    def is_active(self, now, elapsed):
+        if self.trigger_file and os.path.exists(self.trigger_file):
+            try:
+                os.remove(self.trigger_file)
+            except OSError:
+                pass
+            self.fire()
+        with self._lock:
+            return time.monotonic() < self._until
+
+class Scheduler:
+    """
+    카메라를 계속 열어 둔 채로 규칙(TimeWindow/DutyCycle/ExternalTrigger)에 따라
+    캡처 엔진의 세션을 여러 번 시작/종료합니다. 세션마다 새 타임스탬프 폴더가 만들어집니다.
+
+    규칙 중 하나라도 활성화되면 녹화하며, 상태가 바뀌는 순간에만 세션을 시작/종료하므로
+    사용자가 엔터나 제어 서버로 직접 멈춘 세션을 바로 다시 시작하지 않습니다.
+    """
+
+    def __init__(self, engine, rules):
+        self.engine = engine
+        self.rules = list(rules)
+        self.session_count = 0
+
+        self._was_active = False
+        self._owns_session = False
+        self._started_at = time.monotonic()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def triggers(self):
+        return [rule for rule in self.rules if isinstance(rule, ExternalTrigger)]
+
+    def fire_triggers(self):
+        """모든 외부 트리거 규칙에 신호를 보냅니다. 트리거 규칙이 없으면 False를 돌려줍니다."""
+        triggers = self.triggers()
+        for trigger in triggers:
+            trigger.fire()
+        return bool(triggers)
+
+    def start(self):
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+        print("스케줄 녹화를 시작합니다: " + ", ".join(rule.label for rule in self.rules))
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop_event.wait(SCHEDULER_POLL_INTERVAL):
+            self.update()
+
+    def update(self):
+        """현재 시각 기준으로 규칙을 확인하고, 필요하면 세션을 시작하거나 종료합니다."""
+        now = datetime.now()
+        elapsed = time.monotonic() - self._started_at
+        active_rules = [rule for rule in self.rules if rule.is_active(now, elapsed)]
+        is_active = bool(active_rules)
+
+        if is_active and not self._was_active and not self.engine.is_recording:
+            base_save_path = self.engine.start_session()
+            self._owns_session = True
+            self.session_count += 1
+            print(f"\n>>> [{active_rules[0].label}] 녹화를 시작합니다. 저장 폴더: '{base_save_path}'")
+        elif not is_active and self._was_active and self._owns_session:
+            session = self.engine.stop_session()
+            self._owns_session = False
+            if session:
+                print(f"\n>>> 스케줄 녹화를 종료했습니다. 저장 폴더: '{session.path}'")
+
+        # 다른 곳(엔터 키, 제어 서버)에서 세션을 멈췄다면 더 이상 이 세션을 관리하지 않습니다.
+        if self._owns_session and not self.engine.is_recording:
+            self._owns_session = False
+        self._was_active = is_active
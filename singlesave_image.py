@@ -1,6 +1,7 @@
 import cv2
 import os
 from datetime import datetime
+from camera_source import CameraSource, no_signal_frame, GapLog
 
 # --- 설정값 (여기서 원하는 최종 해상도를 설정하세요) ---
 IS_CSI_CAMERA = False  # CSI 카메라면 True, USB 웹캠이면 False
@@ -16,54 +17,19 @@ MAIN_OUTPUT_DIR = "image_recordings" # 저장 폴더
 SAVE_FPS = 10  # 초당 저장할 이미지 수
 # --- ---
 
-def gstreamer_pipeline(capture_width, capture_height, framerate=30):
-    """Jetson Nano의 CSI 카메라를 위한 GStreamer 파이프라인"""
-    return (
-        f"nvarguscamerasrc sensor-id={CAMERA_INDEX} ! "
-        f"video/x-raw(memory:NVMM), width=(int){capture_width}, height=(int){capture_height}, framerate=(fraction){framerate}/1 ! "
-        "nvvidconv flip-method=0 ! "
-        "video/x-raw, format=(string)BGRx ! "
-        "videoconvert ! "
-        "video/x-raw, format=(string)BGR ! appsink"
-    )
-
 def main():
-    # 카메라 종류에 따라 VideoCapture 객체 생성 및 해상도 요청
+    # 카메라 종류에 따라 감시형 카메라 소스 생성 및 해상도 요청
+    # (해상도 확인과 중앙 크롭, 끊김 시 재연결은 CameraSource가 처리합니다)
     if IS_CSI_CAMERA:
-        pipeline = gstreamer_pipeline(CAPTURE_WIDTH, CAPTURE_HEIGHT)
-        cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
         print(f"CSI 카메라 (GStreamer) 모드로 {CAPTURE_WIDTH}x{CAPTURE_HEIGHT} 해상도를 요청합니다.")
     else:
-        cap = cv2.VideoCapture(CAMERA_INDEX)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_WIDTH)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_HEIGHT)
         print(f"USB 카메라 모드로 {CAPTURE_WIDTH}x{CAPTURE_HEIGHT} 해상도를 요청합니다.")
-
-    if not cap.isOpened():
-        print(f"오류: 카메라를 열 수 없습니다. 카메라 종류(CSI/USB)와 인덱스({CAMERA_INDEX}) 설정을 확인하세요.")
-        return
-
-    # 카메라가 실제로 설정한 해상도를 가져옴
-    actual_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    actual_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    
-    # 요청한 값과 실제 값이 다를 경우 사용자에게 알려줌
-    if actual_width != CAPTURE_WIDTH or actual_height != CAPTURE_HEIGHT:
-        print(f"참고: 요청한 {CAPTURE_WIDTH}x{CAPTURE_HEIGHT} 대신, 카메라가 지원하는 {actual_width}x{actual_height}로 설정되었습니다.")
-        print(f"영상은 {CAPTURE_WIDTH}x{CAPTURE_HEIGHT} 크기로 중앙을 잘라내어 표시됩니다.")
-
-    # 실제 영상에서 우리가 원하는 크기의 이미지를 중앙에서 잘라내기 위한 좌표 계산
-    crop_x = (actual_width - CAPTURE_WIDTH) // 2
-    crop_y = (actual_height - CAPTURE_HEIGHT) // 2
-
-    # 예외 처리: 카메라 해상도가 원하는 크기보다 작을 경우
-    if actual_width < CAPTURE_WIDTH or actual_height < CAPTURE_HEIGHT:
-        print(f"오류: 카메라의 실제 해상도({actual_width}x{actual_height})가 원하는 크기({CAPTURE_WIDTH}x{CAPTURE_HEIGHT})보다 작습니다.")
-        cap.release()
+    source = CameraSource(CAMERA_INDEX, CAPTURE_WIDTH, CAPTURE_HEIGHT, IS_CSI_CAMERA)
+    if not source.start():
+        print(f"카메라 종류(CSI/USB)와 인덱스({CAMERA_INDEX}) 설정을 확인하세요.")
         return
 
-    camera_fps = cap.get(cv2.CAP_PROP_FPS)
-    if camera_fps == 0: camera_fps = 30
+    camera_fps = source.fps
 
     print(f"카메라 설정 완료. 라이브 영상을 시작합니다.")
     print("엔터를 누르면 이미지 저장이 시작됩니다.")
@@ -74,17 +40,22 @@ def main():
     capture_interval = int(camera_fps / SAVE_FPS) if SAVE_FPS > 0 else 0
     frame_count = 0
     saved_image_count = 0
+    gap_log = None
 
     try:
         while True:
-            ret, frame = cap.read()
+            ret, cropped_frame = source.read()
+            if is_saving:
+                frame_count += 1
+                gap_log.update(CAMERA_INDEX, source.connected, frame_count)
             if not ret:
-                print("오류: 프레임을 읽을 수 없습니다.")
-                break
+                # 카메라가 재연결되는 동안에는 아무것도 저장하지 않고 화면에만 표시합니다.
+                cv2.imshow('Live Capture', no_signal_frame(CAPTURE_WIDTH, CAPTURE_HEIGHT))
+                # 끊긴 동안에는 read()가 곧바로 돌아오므로 화면 갱신 간격을 늘려 루프가 헛돌지 않게 합니다.
+                if cv2.waitKey(100) & 0xFF == ord('q'):
+                    break
+                continue
             
-            # 원본 프레임을 원하는 크기로 중앙에서 잘라냄
-            cropped_frame = frame[crop_y : crop_y + CAPTURE_HEIGHT, crop_x : crop_x + CAPTURE_WIDTH]
-
             # 상태 텍스트 표시 
             status_text = '' # 빈칸으로 공백처리
             if is_saving:
@@ -106,6 +77,7 @@ def main():
                     current_time_str = datetime.now().strftime("%Y%m%d_%H%M%S")
                     session_dir = os.path.join(MAIN_OUTPUT_DIR, current_time_str)
                     os.makedirs(session_dir, exist_ok=True)
+                    gap_log = GapLog(session_dir)
                     frame_count = 0
                     saved_image_count = 0
                     print(f"\n>>> 이미지 저장을 시작합니다. 저장 폴더: '{session_dir}'")
@@ -115,14 +87,17 @@ def main():
                     break
 
             if is_saving:
-                frame_count += 1
                 if capture_interval > 0 and frame_count % capture_interval == 0:
                     saved_image_count += 1
                     filename = os.path.join(session_dir, f"frame_{saved_image_count:06d}.jpg")
                     cv2.imwrite(filename, cropped_frame)
 
     finally:
-        cap.release()
+        source.stop()
+        if gap_log:
+            gap_log.close(frame_count)
+            if gap_log.gap_count > 0:
+                print(f"카메라 연결이 끊긴 구간 {gap_log.gap_count}개를 '{gap_log.path}'에 기록했습니다.")
         cv2.destroyAllWindows()
         if saved_image_count > 0:
             print(f"총 {saved_image_count}개의 이미지가 '{session_dir}'에 저장되었습니다.")
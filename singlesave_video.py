@@ -1,6 +1,7 @@
 import cv2
 import os
 from datetime import datetime
+from camera_source import CameraSource, no_signal_frame, GapLog
 
 # --- 설정값 (여기서 원하는 최종 해상도를 설정하세요) ---
 IS_CSI_CAMERA = False  # CSI 카메라면 True, USB 웹캠이면 False
@@ -16,46 +17,16 @@ MAIN_OUTPUT_DIR = "video_recordings" # 저장 폴더
 SAVE_FPS = 10  # 저장될 영상의 초당 프레임 수
 # --- ---
 
-def gstreamer_pipeline(capture_width, capture_height, framerate=30):
-    """Jetson Nano의 CSI 카메라를 위한 GStreamer 파이프라인"""
-    return (
-        f"nvarguscamerasrc sensor-id={CAMERA_INDEX} ! "
-        f"video/x-raw(memory:NVMM), width=(int){capture_width}, height=(int){capture_height}, framerate=(fraction){framerate}/1 ! "
-        "nvvidconv flip-method=0 ! "
-        "video/x-raw, format=(string)BGRx ! "
-        "videoconvert ! "
-        "video/x-raw, format=(string)BGR ! appsink"
-    )
-
 def main():
-    # 카메라 종류에 따라 VideoCapture 객체 생성 및 해상도 요청
+    # 카메라 종류에 따라 감시형 카메라 소스 생성 및 해상도 요청
+    # (해상도 확인과 중앙 크롭, 끊김 시 재연결은 CameraSource가 처리합니다)
     if IS_CSI_CAMERA:
-        pipeline = gstreamer_pipeline(CAPTURE_WIDTH, CAPTURE_HEIGHT)
-        cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
         print(f"CSI 카메라 (GStreamer) 모드로 {CAPTURE_WIDTH}x{CAPTURE_HEIGHT} 해상도를 요청합니다.")
     else:
-        cap = cv2.VideoCapture(CAMERA_INDEX)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_WIDTH)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_HEIGHT)
         print(f"USB 카메라 모드로 {CAPTURE_WIDTH}x{CAPTURE_HEIGHT} 해상도를 요청합니다.")
-
-    if not cap.isOpened():
-        print(f"오류: 카메라를 열 수 없습니다. 카메라 종류(CSI/USB)와 인덱스({CAMERA_INDEX}) 설정을 확인하세요.")
-        return
-
-    actual_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    actual_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    
-    if actual_width != CAPTURE_WIDTH or actual_height != CAPTURE_HEIGHT:
-        print(f"참고: 요청한 {CAPTURE_WIDTH}x{CAPTURE_HEIGHT} 대신, 카메라가 지원하는 {actual_width}x{actual_height}로 설정되었습니다.")
-        print(f"영상은 {CAPTURE_WIDTH}x{CAPTURE_HEIGHT} 크기로 중앙을 잘라내어 표시됩니다.")
-
-    crop_x = (actual_width - CAPTURE_WIDTH) // 2
-    crop_y = (actual_height - CAPTURE_HEIGHT) // 2
-
-    if actual_width < CAPTURE_WIDTH or actual_height < CAPTURE_HEIGHT:
-        print(f"오류: 카메라의 실제 해상도({actual_width}x{actual_height})가 원하는 크기({CAPTURE_WIDTH}x{CAPTURE_HEIGHT})보다 작습니다.")
-        cap.release()
+    source = CameraSource(CAMERA_INDEX, CAPTURE_WIDTH, CAPTURE_HEIGHT, IS_CSI_CAMERA)
+    if not source.start():
+        print(f"카메라 종류(CSI/USB)와 인덱스({CAMERA_INDEX}) 설정을 확인하세요.")
         return
 
     print(f"카메라 설정 완료. 라이브 영상을 시작합니다.")
@@ -63,17 +34,24 @@ def main():
 
     is_recording = False
     video_writer = None
+    frame_count = 0
+    gap_log = None
     session_dir = ""
 
     try:
         while True:
-            ret, frame = cap.read()
+            ret, cropped_frame = source.read()
+            if is_recording:
+                frame_count += 1
+                gap_log.update(CAMERA_INDEX, source.connected, frame_count)
             if not ret:
-                print("오류: 프레임을 읽을 수 없습니다.")
-                break
+                # 카메라가 재연결되는 동안에는 아무것도 저장하지 않고 화면에만 표시합니다.
+                cv2.imshow('Live Capture', no_signal_frame(CAPTURE_WIDTH, CAPTURE_HEIGHT))
+                # 끊긴 동안에는 read()가 곧바로 돌아오므로 화면 갱신 간격을 늘려 루프가 헛돌지 않게 합니다.
+                if cv2.waitKey(100) & 0xFF == ord('q'):
+                    break
+                continue
             
-            cropped_frame = frame[crop_y : crop_y + CAPTURE_HEIGHT, crop_x : crop_x + CAPTURE_WIDTH]
-
             display_frame = cropped_frame.copy()
             status_text = ''
             if is_recording:
@@ -96,6 +74,7 @@ def main():
                     current_time_str = datetime.now().strftime("%Y%m%d_%H%M%S")
                     session_dir = os.path.join(MAIN_OUTPUT_DIR, current_time_str)
                     os.makedirs(session_dir, exist_ok=True)
+                    gap_log = GapLog(session_dir)
                     
                     video_filename = os.path.join(session_dir, f"video_{current_time_str}.mp4")
                     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
@@ -113,7 +92,11 @@ def main():
     finally:
         if video_writer:
             video_writer.release()
-        cap.release()
+        source.stop()
+        if gap_log:
+            gap_log.close(frame_count)
+            if gap_log.gap_count > 0:
+                print(f"카메라 연결이 끊긴 구간 {gap_log.gap_count}개를 '{gap_log.path}'에 기록했습니다.")
         cv2.destroyAllWindows()
         if is_recording:
             print(f"영상이 '{session_dir}'에 저장되었습니다.")
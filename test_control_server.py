@@ -0,0 +1,106 @@
+import http.client
+import json
+import unittest
+import numpy as np
+from control_server import ControlServer
+
+class StubEngine:
+    """ControlServer가 사용하는 부분만 흉내 낸 캡처 엔진."""
+
+    def __init__(self):
+        self.camera_indices = [0, 2]
+        self.quit_requested = False
+        self.recording = False
+        self.frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def stats(self):
+        return {"recording": self.recording, "cameras": [{"index": i} for i in self.camera_indices]}
+
+    def start_session(self):
+        self.recording = True
+        return "data_recordings/test_session"
+
+    def stop_session(self):
+        if not self.recording:
+            return None
+        self.recording = False
+        return type("Session", (), {"path": "data_recordings/test_session"})()
+
+    def latest_frame(self, camera_position):
+        return self.frame
+
+class ControlServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = StubEngine()
+        self.server = ControlServer(self.engine, port=0, preview_fps=20)
+        self.assertTrue(self.server.start())
+
+    def tearDown(self):
+        self.server.stop()
+
+    def request(self, method, path):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+        try:
+            conn.request(method, path)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+
+    def test_status(self):
+        status, body = self.request("GET", "/status")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, self.engine.stats())
+
+    def test_start_and_stop(self):
+        status, body = self.request("POST", "/start")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {"recording": True, "session_path": "data_recordings/test_session"})
+        self.assertTrue(self.engine.recording)
+
+        status, body = self.request("POST", "/stop")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {"recording": False, "session_path": "data_recordings/test_session"})
+        self.assertFalse(self.engine.recording)
+
+        # 녹화 중이 아닐 때 /stop은 세션 경로 없이 응답합니다.
+        status, body = self.request("POST", "/stop")
+        self.assertEqual(body["session_path"], None)
+
+    def test_shutdown(self):
+        status, body = self.request("POST", "/shutdown")
+        self.assertEqual(status, 200)
+        self.assertTrue(self.engine.quit_requested)
+
+    def test_unknown_path(self):
+        status, _ = self.request("GET", "/nope")
+        self.assertEqual(status, 404)
+
+    def test_preview(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+        try:
+            conn.request("GET", "/preview/2")
+            response = conn.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertTrue(response.getheader("Content-Type").startswith("multipart/x-mixed-replace"))
+            self.assertEqual(response.readline(), b"--frame\r\n")
+            headers = {}
+            while True:
+                line = response.readline().strip()
+                if not line:
+                    break
+                name, value = line.decode("latin-1").split(":", 1)
+                headers[name.strip()] = value.strip()
+            self.assertEqual(headers["Content-Type"], "image/jpeg")
+            jpeg = response.read(int(headers["Content-Length"]))
+            self.assertEqual(jpeg[:2], b"\xff\xd8")
+        finally:
+            conn.close()
+
+    def test_preview_unknown_camera(self):
+        status, _ = self.request("GET", "/preview/5")
+        self.assertEqual(status, 404)
+
+if __name__ == '__main__':
+    unittest.main()
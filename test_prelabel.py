@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import numpy as np
+from prelabel import PrelabelSink, load_detector
+
+class PrelabelSinkTest(unittest.TestCase):
+    """무작위 초기화한 검출 모델을 CPU에서 실제로 돌려 PrelabelSink의 동작을 확인합니다."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model, cls.categories, cls.device = load_detector(weights=None, device="cpu")
+        if cls.model is None:
+            raise unittest.SkipTest("torch/torchvision을 사용할 수 없습니다.")
+
+    def setUp(self):
+        self.image_dir = tempfile.mkdtemp()
+        self.frame = np.zeros((64, 64, 3), dtype=np.uint8)
+
+    def tearDown(self):
+        shutil.rmtree(self.image_dir)
+
+    def make_items(self, prefix, count):
+        return [(os.path.join(self.image_dir, f"{prefix}_{i}.jpg"), self.frame) for i in range(count)]
+
+    def label_path(self, item):
+        return os.path.splitext(item[0])[0] + ".txt"
+
+    def make_sink(self, model=None, max_fps=0):
+        return PrelabelSink(model or self.model, self.categories, self.device, classes=["class_1"], max_fps=max_fps)
+
+    def test_batch_writes_one_label_per_frame(self):
+        sink = self.make_sink()
+        items = self.make_items("a", 3)
+        self.assertTrue(sink.submit(items))
+        sink.stop()
+
+        for item in items:
+            with open(self.label_path(item)) as f:
+                for line in f:
+                    values = line.split()
+                    self.assertEqual(len(values), 5)
+                    self.assertEqual(values[0], "0")
+        self.assertEqual(sink.stats()["labeled_images"], 3)
+
+    def test_submit_drops_without_waiting_when_queue_is_full(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_model(images):
+            started.set()
+            release.wait(10)
+            return self.model(images)
+
+        sink = self.make_sink(blocking_model)
+        first, second, third = self.make_items("a", 2), self.make_items("b", 2), self.make_items("c", 2)
+        self.assertTrue(sink.submit(first))
+        self.assertTrue(started.wait(10))
+        self.assertTrue(sink.submit(second)) # 추론 중에는 한 묶음까지 기다릴 수 있습니다.
+
+        begin = time.monotonic()
+        self.assertFalse(sink.submit(third))
+        self.assertLess(time.monotonic() - begin, 0.05)
+
+        stats = sink.stats()
+        self.assertEqual(stats["dropped_images"], 2)
+        self.assertEqual(stats["skipped_images"], 0)
+
+        # stop()은 대기 중인 묶음까지 처리한 뒤 끝납니다.
+        release.set()
+        sink.stop()
+        stats = sink.stats()
+        self.assertEqual(stats["labeled_images"], 4)
+        self.assertEqual(stats["pending_batches"], 0)
+        for item in first + second:
+            self.assertTrue(os.path.exists(self.label_path(item)))
+        for item in third:
+            self.assertFalse(os.path.exists(self.label_path(item)))
+
+    def test_rate_limit_is_counted_separately(self):
+        sink = self.make_sink(max_fps=1)
+        self.assertTrue(sink.submit(self.make_items("a", 2)))
+        self.assertFalse(sink.submit(self.make_items("b", 2)))
+        sink.stop()
+
+        stats = sink.stats()
+        self.assertEqual(stats["skipped_images"], 2)
+        self.assertEqual(stats["dropped_images"], 0)
+        self.assertEqual(stats["labeled_images"], 2)
+
+if __name__ == '__main__':
+    unittest.main()